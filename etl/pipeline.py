@@ -9,10 +9,11 @@ Merge strategy:
   - source field reflects provenance: "Bulletin", "CAB", or "CAB+Bulletin"
 """
 
-import json
 from pathlib import Path
 from typing import Any
 
+import orjson
+
 DATA_DIR = Path(__file__).parent.parent / "data"
 CAB_FILE = DATA_DIR / "cab_courses.json"
 BULLETIN_FILE = DATA_DIR / "bulletin_courses.json"
@@ -21,7 +22,6 @@ OUTPUT_FILE = DATA_DIR / "courses.json"
 MERGE_FIELDS = ("description", "prerequisites", "title", "department",
                 "instructor", "meeting_times")
 
-
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
@@ -30,12 +30,17 @@ def load(path: Path) -> list[dict[str, Any]]:
     """Load a JSON array from disk; return [] if the file doesn't exist."""
     if not path.exists():
         return []
-    return json.loads(path.read_text(encoding="utf-8"))
+    return orjson.loads(path.read_bytes())
 
 
 def normalize_code(code: str) -> str:
     """Canonicalise course codes: 'CSCI 0320' and 'csci0320' → 'CSCI0320'."""
-    return code.replace(" ", "").upper().strip()
+    code = code.replace(" ", "").upper()
+    if not code.isalnum():
+        # Other separators scrapers leave behind: tabs/newlines, NBSP from
+        # CAB's HTML (str.split() treats it as whitespace), underscores.
+        code = "".join(code.split()).replace("_", "")
+    return code
 
 
 # ---------------------------------------------------------------------------
@@ -50,15 +55,17 @@ def merge_courses(cab: list[dict[str, Any]], bulletin: list[dict[str, Any]]) ->
     """
     index: dict[str, dict] = {}
 
+    # Normalise each record's code exactly once up front
+    bulletin_norm = [(normalize_code(c.get("course_code", "")), c) for c in bulletin]
+    cab_norm = [(normalize_code(c.get("course_code", "")), c) for c in cab]
+
     # 1. Index Bulletin courses (richer schedule/instructor data)
-    for course in bulletin:
-        code = normalize_code(course.get("course_code", ""))
+    for code, course in bulletin_norm:
         if code:
             index[code] = {**course, "course_code": code}
 
     # 2. Merge CAB courses
-    for course in cab:
-        code = normalize_code(course.get("course_code", ""))
+    for code, course in cab_norm:
         if not code:
             continue
 
@@ -86,7 +93,5 @@ def run() -> list[dict[str, Any]]:
     courses = merge_courses(cab, bulletin)
 
     DATA_DIR.mkdir(exist_ok=True)
-    OUTPUT_FILE.write_text(
-        json.dumps(courses, indent=2, ensure_ascii=False), encoding="utf-8"
-    )
+    OUTPUT_FILE.write_bytes(orjson.dumps(courses, option=orjson.OPT_INDENT_2))
     return courses
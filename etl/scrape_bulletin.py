@@ -2,7 +2,9 @@
 Scraper for the Brown University Bulletin (bulletin.brown.edu).
 
 The Bulletin is fully server-rendered static HTML — no JS rendering or API
-reverse-engineering needed. All data is fetched with plain requests + BS4.
+reverse-engineering needed. All data is fetched with plain requests and parsed
+with lxml (raw bytes, so lxml detects the encoding itself); every field is
+pulled with a precompiled XPath so tree traversal runs in libxml2.
 
 Discovered structure (verified by inspecting bulletin.brown.edu):
   - Department index: /departments-centers-programs-institutes/
@@ -24,12 +26,16 @@ Output: data/bulletin_courses.json
 import json
 import logging
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
+import lxml.html
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree
+from requests.adapters import HTTPAdapter
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -41,21 +47,89 @@ DEPT_INDEX = f"{BASE_URL}/departments-centers-programs-institutes/"
 DATA_DIR = Path(__file__).parent.parent / "data"
 OUTPUT_FILE = DATA_DIR / "bulletin_courses.json"
 
-REQUEST_DELAY = 0.3   # seconds between page fetches
+REQUEST_DELAY = 0.3   # min seconds between request starts (shared by all workers)
+MAX_WORKERS = 8       # departments fetched + parsed concurrently
 
 log = logging.getLogger(__name__)
 
 SESSION = requests.Session()
 SESSION.headers["User-Agent"] = "Brown-Course-Search-RAG/1.0 (research project)"
+# Keep-alive pool with room for every MAX_WORKERS thread (plus headroom), so
+# concurrent fetches reuse TLS connections instead of reopening them.
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+
+# ---------------------------------------------------------------------------
+# XPath selectors (compiled once, evaluated in libxml2)
+# ---------------------------------------------------------------------------
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching one token of a space-separated class attribute."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_DEPT_LINK_XP = etree.XPath(f"//div[{_has_class('clearfix')}]//a[@href]")
+_BLOCK_XP     = etree.XPath(f"//div[{_has_class('courseblock')}]")
+_TITLE_XP     = etree.XPath(f".//p[{_has_class('courseblocktitle')}]")
+_STRONG_XP    = etree.XPath(".//strong")
+_DESC_XP      = etree.XPath(f".//p[{_has_class('courseblockdesc')}]")
+_OFFER_XP     = etree.XPath(f".//table[{_has_class('tbl_offering')}]")
+_ROW_XP       = etree.XPath(".//tr")
+_CELL_XP      = etree.XPath(".//td")
+_TEXT_XP      = etree.XPath(".//text()")
+
+
+# Regexes used per courseblock, compiled once at import.
+_RE_PREREQ       = re.compile(r"(prerequisite[s]?[:\s].+?)(?:\.|$)", re.IGNORECASE)
+_RE_PARENS       = re.compile(r"\(.*?\)")
+_RE_PARENS_CHARS = re.compile(r"[()]")
+_RE_ARRANGED     = re.compile(r"arranged|TBA", re.IGNORECASE)
+_RE_CODE_PREFIX  = re.compile(r"^[A-Z]+\s*\d+[A-Z]*\.\s*")
+
+
+def _parse_page(content: bytes):
+    """Parsed HTML root, or None for a body lxml can't parse (e.g. empty 200)."""
+    if not content.strip():
+        return None
+    try:
+        return lxml.html.fromstring(content)
+    except etree.ParserError:
+        return None
+
+
+def _text(el, sep: str = " ") -> str:
+    """Stripped, non-empty text nodes of el joined by sep."""
+    return sep.join(t for t in (s.strip() for s in _TEXT_XP(el)) if t)
 
 
 # ---------------------------------------------------------------------------
 # HTTP helper
 # ---------------------------------------------------------------------------
 
+_throttle_lock = threading.Lock()
+_next_request_at = 0.0
+
+
+def _throttle() -> None:
+    """
+    Space request starts REQUEST_DELAY apart across all worker threads.
+
+    Each caller reserves the next slot under the lock and sleeps outside it,
+    so workers overlap network latency and parsing while the host never sees
+    more than one new request per REQUEST_DELAY.
+    """
+    global _next_request_at
+    with _throttle_lock:
+        now = time.monotonic()
+        slot = max(now, _next_request_at)
+        _next_request_at = slot + REQUEST_DELAY
+    time.sleep(slot - now)
+
+
 def _get(url: str, retries: int = 3) -> Optional[requests.Response]:
     """GET a URL with exponential-backoff retries."""
     for attempt in range(retries):
+        _throttle()
         try:
             resp = SESSION.get(url, timeout=15)
             resp.raise_for_status()
@@ -82,11 +156,14 @@ def fetch_department_urls() -> list[tuple[str, str]]:
         log.error("Could not fetch department index: %s", DEPT_INDEX)
         return []
 
-    soup = BeautifulSoup(resp.text, "html.parser")
+    doc = _parse_page(resp.content)
+    if doc is None:
+        log.error("Empty or unparseable department index: %s", DEPT_INDEX)
+        return []
     depts = []
-    for a in soup.select("div.clearfix a[href]"):
-        href = a["href"].strip()
-        name = a.get_text(strip=True)
+    for a in _DEPT_LINK_XP(doc):
+        href = a.get("href").strip()
+        name = _text(a, sep="")
         if href and name:
             url = href if href.startswith("http") else f"{BASE_URL}{href}"
             depts.append((name, url))
@@ -101,11 +178,7 @@ def fetch_department_urls() -> list[tuple[str, str]]:
 
 def _extract_prereqs(description: str) -> str:
     """Pull the prerequisite sentence(s) out of the description text."""
-    match = re.search(
-        r"(prerequisite[s]?[:\s].+?)(?:\.|$)",
-        description,
-        flags=re.IGNORECASE,
-    )
+    match = _RE_PREREQ.search(description)
     return match.group(0).strip() if match else ""
 
 
@@ -117,23 +190,22 @@ def _parse_offering_table(table) -> tuple[str, str]:
     meeting_times is formatted as "MWF 10:00-10:50" or "TTh 13:00-14:20".
     Instructor is the name stripped of surrounding parentheses.
     """
-    rows = table.find_all("tr")
-    for row in rows:
-        cols = row.find_all("td")
+    for row in _ROW_XP(table):
+        cols = _CELL_XP(row)
         if len(cols) < 7:
             continue
-        days = cols[4].get_text(strip=True)
-        time_str = cols[5].get_text(strip=True)
-        raw_instructor = cols[6].get_text(strip=True)
+        days = _text(cols[4], sep="")
+        time_str = _text(cols[5], sep="")
+        raw_instructor = _text(cols[6], sep="")
 
         # Meeting time: strip room number in parens from the time field
         # e.g. "10:00-10:50(Sm 102)" → "10:00-10:50"
-        time_clean = re.sub(r"\(.*?\)", "", time_str).strip()
+        time_clean = _RE_PARENS.sub("", time_str).strip()
         meeting = f"{days} {time_clean}".strip() if days and time_clean else ""
 
         # Instructor: "(K. Fisler)" → "K. Fisler"; blank if "To Be Arranged"
-        instructor = re.sub(r"[()]", "", raw_instructor).strip()
-        if re.search(r"arranged|TBA", instructor, flags=re.IGNORECASE):
+        instructor = _RE_PARENS_CHARS.sub("", raw_instructor).strip()
+        if _RE_ARRANGED.search(instructor):
             instructor = ""
 
         return meeting, instructor
@@ -144,21 +216,22 @@ def _parse_offering_table(table) -> tuple[str, str]:
 def parse_courseblock(block, dept_name: str) -> Optional[dict]:
     """Parse a single <div class="courseblock"> into the target schema."""
     # --- code and title ---
-    title_tag = block.find("p", class_="courseblocktitle")
-    if not title_tag:
+    title_tags = _TITLE_XP(block)
+    if not title_tags:
         return None
+    title_tag = title_tags[0]
 
     # Prefer data-code attribute (already clean: "CSCI 0320")
     raw_code = title_tag.get("data-code", "").strip()
     course_code = raw_code.replace(" ", "") if raw_code else ""
 
-    strong = title_tag.find("strong")
-    raw_title = strong.get_text(" ", strip=True) if strong else title_tag.get_text(" ", strip=True)
+    strong = _STRONG_XP(title_tag)
+    raw_title = _text(strong[0] if strong else title_tag)
     # "CSCI 0320. Introduction to Software Engineering."  → strip code prefix
-    title = re.sub(r"^[A-Z]+\s*\d+[A-Z]*\.\s*", "", raw_title).rstrip(". ")
+    title = _RE_CODE_PREFIX.sub("", raw_title).rstrip(". ")
 
     # --- description (join multiple paragraphs) ---
-    desc_parts = [p.get_text(" ", strip=True) for p in block.find_all("p", class_="courseblockdesc")]
+    desc_parts = [_text(p) for p in _DESC_XP(block)]
     description = " ".join(desc_parts)
 
     # --- prerequisites (extracted from description) ---
@@ -167,9 +240,9 @@ def parse_courseblock(block, dept_name: str) -> Optional[dict]:
     # --- schedule from offerings table (may not exist for all courses) ---
     meeting_times = ""
     instructor = ""
-    table = block.find("table", class_="tbl_offering")
-    if table:
-        meeting_times, instructor = _parse_offering_table(table)
+    tables = _OFFER_XP(block)
+    if tables:
+        meeting_times, instructor = _parse_offering_table(tables[0])
 
     if not course_code and not title:
         return None
@@ -197,8 +270,12 @@ def scrape_department(name: str, url: str) -> list[dict]:
         log.warning("Skipping department '%s' — request failed.", name)
         return []
 
-    soup = BeautifulSoup(resp.text, "html.parser")
-    blocks = soup.find_all("div", class_="courseblock")
+    doc = _parse_page(resp.content)
+    if doc is None:
+        log.warning("Skipping department '%s' — empty or unparseable page.", name)
+        return []
+
+    blocks = _BLOCK_XP(doc)
     if not blocks:
         log.debug("No courseblocks found on '%s' (%s).", name, url)
         return []
@@ -224,10 +301,16 @@ def scrape_all() -> list[dict]:
         log.error("No departments found. Check connectivity and %s", DEPT_INDEX)
         return []
 
-    all_courses: list[dict] = []
-    for name, url in depts:
+    def scrape(dept: tuple[str, str]) -> list[dict]:
+        name, url = dept
         log.info("Scraping: %s", name)
-        all_courses.extend(scrape_department(name, url))
-        time.sleep(REQUEST_DELAY)
+        return scrape_department(name, url)
+
+    # Requests' Session is shared; its urllib3 pool is thread-safe. map()
+    # keeps the department order of the index page.
+    all_courses: list[dict] = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        for courses in pool.map(scrape, depts):
+            all_courses.extend(courses)
 
     return all_courses
\ No newline at end of file
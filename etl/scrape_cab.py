@@ -6,6 +6,8 @@ at /ribbit/index.cgi. All data is fetched with Playwright because cab.brown.edu
 sits behind AWS WAF, which returns HTTP 202 (JS challenge) to plain requests.
 Playwright's context.request API sends requests with a real browser session
 (including the WAF token cookie), bypassing the challenge automatically.
+The async API is used so each subject's course details are fetched
+concurrently over the one context (at most MAX_CONCURRENCY in flight).
 
 Discovered by inspecting cab.brown.edu network traffic:
   - page=listsubjects.rjs  → JSON list of all department codes
@@ -19,17 +21,18 @@ left empty here; scrape_bulletin.py fills those from the Bulletin.
 Output: data/cab_courses.json
 """
 
+import asyncio
 import json
 import logging
 import os
 import re
-import time
 from datetime import date
 from pathlib import Path
 from typing import Optional
 
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
+import lxml.html
+from lxml import etree
+from playwright.async_api import async_playwright
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -70,11 +73,46 @@ def _candidate_terms(seed_term: str) -> list[str]:
 DATA_DIR = Path(__file__).parent.parent / "data"
 OUTPUT_FILE = DATA_DIR / "cab_courses.json"
 
-REQUEST_DELAY = 0.25  # seconds between requests
+MAX_CONCURRENCY = 8   # Ribbit requests in flight at once
+
+# Sent on Ribbit API calls only (context.request), so concurrent fetches reuse
+# pooled TLS connections. Page navigations keep Chromium's own headers.
+API_HEADERS = {"Connection": "keep-alive"}
 
 log = logging.getLogger(__name__)
 
 
+# ---------------------------------------------------------------------------
+# XPath selectors (compiled once, evaluated in libxml2)
+# ---------------------------------------------------------------------------
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching one token of a space-separated class attribute."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_RESULT_XP = etree.XPath("(//result | //course)")
+_TITLE_XP  = etree.XPath(f"//p[{_has_class('courseblocktitle')}]")
+_DESC_XP   = etree.XPath(f"//p[{_has_class('courseblockdesc')}]")
+_EXTRA_XP  = etree.XPath(f"//p[{_has_class('courseblockextra')}]")
+_TEXT_XP   = etree.XPath(".//text()")
+
+# Ribbit wraps the fragment in a tiny XML document; recover from stray markup.
+_XML_PARSER = etree.XMLParser(recover=True)
+
+
+# Regexes used per courseblock, compiled once at import.
+_RE_CODE_MATCH   = re.compile(r"^([A-Z]+\s+\d+[A-Z]*)\.")
+_RE_CODE_PREFIX  = re.compile(r"^[A-Z]+\s+\d+[A-Z]*\.\s*")
+_RE_CREDITS_TAIL = re.compile(r"\.\s*\d+\.?\d*\s*credit.*$", re.IGNORECASE)
+_RE_INSTR_LABEL  = re.compile(r"^instructor[s]?:?\s*", re.IGNORECASE)
+
+
+def _text(el) -> str:
+    """Stripped, non-empty text nodes of el joined by spaces."""
+    return " ".join(t for t in (s.strip() for s in _TEXT_XP(el)) if t)
+
+
 # ---------------------------------------------------------------------------
 # Playwright session  (one browser for the whole scrape)
 # ---------------------------------------------------------------------------
@@ -83,49 +121,60 @@ class _CABSession:
     """
     Wraps a single Playwright browser context for all Ribbit API calls.
 
-    On first use, opens Chromium headlessly and navigates to the CAB home
-    page so the AWS WAF JS challenge is solved and the token cookie is set.
-    All subsequent requests via context.request reuse that cookie, bypassing
-    the WAF without launching extra browsers.
+    open() launches Chromium headlessly and navigates to the CAB home page so
+    the AWS WAF JS challenge is solved and the token cookie is set. All
+    subsequent requests via context.request reuse that cookie, bypassing the
+    WAF without launching extra browsers. A semaphore caps concurrent requests.
     """
 
-    def __init__(self):
-        self._pw = sync_playwright().start()
-        self._browser = self._pw.chromium.launch(headless=True)
-        self._context = self._browser.new_context()
+    def __init__(self, pw, browser, context):
+        self._pw = pw
+        self._browser = browser
+        self._context = context
+        self._sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    @classmethod
+    async def open(cls) -> "_CABSession":
+        pw = await async_playwright().start()
+        browser = await pw.chromium.launch(headless=True)
+        context = await browser.new_context()
         log.info("Establishing CAB browser session (solving WAF challenge)…")
-        page = self._context.new_page()
-        page.goto("https://cab.brown.edu/", wait_until="networkidle", timeout=30_000)
-        page.close()
+        page = await context.new_page()
+        await page.goto("https://cab.brown.edu/", wait_until="networkidle", timeout=30_000)
+        await page.close()
         log.info("Session ready.")
+        return cls(pw, browser, context)
 
-    def get(self, params: dict, retries: int = 3) -> Optional[str]:
+    async def get(self, params: dict, retries: int = 3) -> Optional[str]:
         """GET a Ribbit endpoint; return response text or None on failure."""
-        url = BASE_URL + "?" + "&".join(f"{k}={v}" for k, v in params.items())
         for attempt in range(retries):
             try:
-                resp = self._context.request.get(url, timeout=15_000)
-                if resp.ok:
-                    return resp.text()
-                log.warning("HTTP %s for %s", resp.status, url)
+                # Playwright URL-encodes params ("CSCI 0320" → "CSCI+0320").
+                async with self._sem:
+                    resp = await self._context.request.get(
+                        BASE_URL, params=params, headers=API_HEADERS, timeout=15_000
+                    )
+                    if resp.ok:
+                        return await resp.text()
+                log.warning("HTTP %s for %s %s", resp.status, BASE_URL, params)
             except Exception as exc:
                 log.warning("Request failed (attempt %d/%d): %s", attempt + 1, retries, exc)
                 if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
+                    await asyncio.sleep(2 ** attempt)
         return None
 
-    def close(self):
-        self._browser.close()
-        self._pw.stop()
+    async def close(self):
+        await self._browser.close()
+        await self._pw.stop()
 
 
 _SESSION: Optional[_CABSession] = None
 
 
-def _get_session() -> _CABSession:
+async def _get_session() -> _CABSession:
     global _SESSION
     if _SESSION is None:
-        _SESSION = _CABSession()
+        _SESSION = await _CABSession.open()
     return _SESSION
 
 
@@ -133,7 +182,7 @@ def _get_session() -> _CABSession:
 # Ribbit API calls
 # ---------------------------------------------------------------------------
 
-def fetch_subjects() -> list[str]:
+async def fetch_subjects() -> list[str]:
     """
     Return all department/subject codes from the catalog.
 
@@ -141,8 +190,9 @@ def fetch_subjects() -> list[str]:
     """
     global ACTIVE_TERM
 
+    session = await _get_session()
     for term in _candidate_terms(CURRENT_TERM):
-        text = _get_session().get({"page": "listsubjects.rjs", "Term": term})
+        text = await session.get({"page": "listsubjects.rjs", "Term": term})
         if not text:
             continue
 
@@ -160,13 +210,14 @@ def fetch_subjects() -> list[str]:
     return []
 
 
-def fetch_course_codes(subject: str) -> list[str]:
+async def fetch_course_codes(subject: str) -> list[str]:
     """
     Return all course codes for a subject (e.g. ["CSCI 0111", "CSCI 0320", ...]).
 
     Ribbit response: JSON array of objects with 'key' (full code) and 'name' (title).
     """
-    text = _get_session().get({"page": "listcourses.rjs", "subject": subject, "Term": ACTIVE_TERM})
+    session = await _get_session()
+    text = await session.get({"page": "listcourses.rjs", "subject": subject, "Term": ACTIVE_TERM})
     if not text:
         return []
     try:
@@ -177,30 +228,33 @@ def fetch_course_codes(subject: str) -> list[str]:
         return []
 
 
-def fetch_course_detail(code: str) -> Optional[str]:
+async def fetch_course_detail(code: str) -> Optional[str]:
     """
     Return the raw HTML courseblock string for a single course.
 
     Ribbit response: XML like <result><![CDATA[<div class="courseblock">...</div>]]></result>
-    BeautifulSoup extracts the inner text, which is the HTML fragment.
+    Parsed as XML, the CDATA section is the <result> element's text, which is
+    the HTML fragment.
     """
-    text = _get_session().get({"page": "getcourse.rjs", "code": code, "Term": ACTIVE_TERM})
+    session = await _get_session()
+    text = await session.get({"page": "getcourse.rjs", "code": code, "Term": ACTIVE_TERM})
     if not text:
         return None
-    # The outer document is minimal XML; BS4's html.parser handles it fine.
-    soup = BeautifulSoup(text, "html.parser")
-    result_tag = soup.find("result") or soup.find("course")
-    if not result_tag:
+    root = etree.fromstring(text.encode("utf-8"), _XML_PARSER)
+    nodes = _RESULT_XP(root) if root is not None else []
+    # Prefer <result> over <course>, as before.
+    result_tag = next((n for n in nodes if n.tag == "result"), nodes[0] if nodes else None)
+    if result_tag is None:
         log.debug("No result tag in response for %s", code)
         return None
-    return result_tag.decode_contents()
+    return "".join(result_tag.itertext())
 
 
 # ---------------------------------------------------------------------------
 # HTML parsing
 # ---------------------------------------------------------------------------
 
-def _parse_courseblock(html: str, subject: str) -> dict:
+def _parse_courseblock(html: str, subject: str) -> Optional[dict]:
     """
     Parse a CourseLeaf courseblock HTML fragment into the target schema.
 
@@ -211,36 +265,44 @@ def _parse_courseblock(html: str, subject: str) -> dict:
           <p class="courseblockextra">Prerequisite: CSCI 0111 or CSCI 0150.</p>
           <p class="courseblockextra">Instructor: Tim Nelson.</p>
         </div>
+
+    Returns None for fragments lxml can't parse (CAB sends whitespace-only
+    details for some sections), so one bad section doesn't abort the subject.
     """
-    soup = BeautifulSoup(html, "html.parser")
+    if not html.strip():
+        return None
+    try:
+        root = lxml.html.fromstring(html)
+    except etree.ParserError:
+        return None
 
     # --- title block: "CSCI 0320. Introduction to Software Engineering. 1 unit." ---
-    title_tag = soup.find("p", class_="courseblocktitle")
-    raw_title = title_tag.get_text(" ", strip=True) if title_tag else ""
+    title_tags = _TITLE_XP(root)
+    raw_title = _text(title_tags[0]) if title_tags else ""
 
-    code_match = re.match(r"^([A-Z]+\s+\d+[A-Z]*)\.", raw_title)
+    code_match = _RE_CODE_MATCH.match(raw_title)
     course_code = code_match.group(1).replace(" ", "") if code_match else ""
     # Title is everything after "CODE. " up to the next period (credits come last)
-    title = re.sub(r"^[A-Z]+\s+\d+[A-Z]*\.\s*", "", raw_title)
-    title = re.sub(r"\.\s*\d+\.?\d*\s*credit.*$", "", title, flags=re.IGNORECASE).strip(" .")
+    title = _RE_CODE_PREFIX.sub("", raw_title)
+    title = _RE_CREDITS_TAIL.sub("", title).strip(" .")
 
     # --- description ---
-    desc_tag = soup.find("p", class_="courseblockdesc")
-    description = desc_tag.get_text(" ", strip=True) if desc_tag else ""
+    desc_tags = _DESC_XP(root)
+    description = _text(desc_tags[0]) if desc_tags else ""
 
     # --- extra fields (prerequisites, instructor, etc.) ---
     prerequisites = ""
     instructor = ""
     meeting_times = ""
 
-    for extra in soup.find_all("p", class_="courseblockextra"):
-        text = extra.get_text(" ", strip=True)
+    for extra in _EXTRA_XP(root):
+        text = _text(extra)
         lower = text.lower()
         if "prerequisite" in lower or "prereq" in lower:
             prerequisites = text
         elif "instructor" in lower:
             # Strip the label, keep the value
-            instructor = re.sub(r"^instructor[s]?:?\s*", "", text, flags=re.IGNORECASE).strip()
+            instructor = _RE_INSTR_LABEL.sub("", text).strip()
         elif any(k in lower for k in ("meeting", "schedule", "time", "days")):
             meeting_times = text
 
@@ -260,38 +322,48 @@ def _parse_courseblock(html: str, subject: str) -> dict:
 # Orchestration
 # ---------------------------------------------------------------------------
 
-def scrape_subject(subject: str) -> list[dict]:
+async def scrape_subject(subject: str) -> list[dict]:
     """Scrape all courses for one subject; return list of course dicts."""
-    codes = fetch_course_codes(subject)
+    codes = await fetch_course_codes(subject)
     if not codes:
         log.warning("No courses found for subject '%s'.", subject)
         return []
 
+    # Fan out every detail fetch; the session semaphore bounds concurrency.
+    htmls = await asyncio.gather(*(fetch_course_detail(code) for code in codes))
+
     courses = []
-    for code in codes:
-        html = fetch_course_detail(code)
+    for code, html in zip(codes, htmls):
         if not html:
             log.debug("Skipping %s — no detail returned.", code)
             continue
         course = _parse_courseblock(html, subject)
-        if course["course_code"]:
+        if course and course["course_code"]:
             courses.append(course)
-        time.sleep(REQUEST_DELAY)
 
     log.info("  %s: %d/%d courses parsed.", subject, len(courses), len(codes))
     return courses
 
 
-def scrape_all() -> list[dict]:
-    """Scrape every subject in the catalog and return all course dicts."""
-    subjects = fetch_subjects()
-    if not subjects:
-        log.error("No subjects found. Check CAB_TERM/CURRENT_TERM (%s) and connectivity.", CURRENT_TERM)
-        return []
+async def _scrape_all() -> list[dict]:
+    global _SESSION
+    try:
+        subjects = await fetch_subjects()
+        if not subjects:
+            log.error("No subjects found. Check CAB_TERM/CURRENT_TERM (%s) and connectivity.", CURRENT_TERM)
+            return []
+
+        all_courses: list[dict] = []
+        for subject in subjects:
+            log.info("Scraping: %s", subject)
+            all_courses.extend(await scrape_subject(subject))
+        return all_courses
+    finally:
+        if _SESSION is not None:
+            await _SESSION.close()
+            _SESSION = None
 
-    all_courses: list[dict] = []
-    for subject in subjects:
-        log.info("Scraping: %s", subject)
-        all_courses.extend(scrape_subject(subject))
 
-    return all_courses
+def scrape_all() -> list[dict]:
+    """Scrape every subject in the catalog and return all course dicts."""
+    return asyncio.run(_scrape_all())
@@ -1,20 +1,20 @@
 """
 Streamlit frontend for Brown Course Search.
 
-Calls POST http://localhost:8000/query and displays the LLM answer
-and retrieved courses as a table.
+Calls POST http://localhost:8000/query/stream and renders the LLM answer
+token-by-token as it arrives, followed by the retrieved courses as a table.
 """
 
-import json
 import os
 from pathlib import Path
 
+import orjson
 import requests
 import streamlit as st
 
 # Use environment variable for Docker compatibility
 API_HOST = os.getenv("API_HOST", "localhost")
-API_URL = f"http://{API_HOST}:8000/query"
+API_URL = f"http://{API_HOST}:8000/query/stream"
 COURSES_FILE = Path(__file__).parent.parent / "data" / "courses.json"
 
 st.set_page_config(page_title="Brown Course Search", layout="centered")
@@ -37,15 +37,55 @@ Use this app to search Brown courses with RAG.
 )
 
 
-def _load_departments() -> list[str]:
+@st.cache_resource
+def _http() -> requests.Session:
+    """One pooled session per server process; the script reruns on every interaction."""
+    return requests.Session()
+
+
+@st.cache_data(ttl=3600)
+def _load_departments(mtime_ns: int) -> list[str]:
+    """Sorted department names; cached across reruns, keyed on the file's mtime."""
     if not COURSES_FILE.exists():
         return []
-    courses = json.loads(COURSES_FILE.read_text(encoding="utf-8"))
+    courses = orjson.loads(COURSES_FILE.read_bytes())
     depts = sorted({c.get("department", "") for c in courses if c.get("department")})
     return depts
 
 
-departments = _load_departments()
+def _stream_answer(resp: requests.Response, meta: dict):
+    """
+    Yield answer tokens from the /query/stream SSE response.
+
+    The leading "courses" event is stored into meta so the table can be
+    rendered once the answer has finished streaming. A server "error" event
+    or a dropped connection ends the stream with meta["error"] set.
+    """
+    event = None
+    try:
+        for line in resp.iter_lines(decode_unicode=True):
+            if not line:
+                event = None
+                continue
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                continue
+            if not line.startswith("data: "):
+                continue
+            data = line[len("data: "):]
+            if event == "courses":
+                meta.update(orjson.loads(data))
+            elif event == "error":
+                meta["error"] = orjson.loads(data)
+            elif data == "[DONE]":
+                return
+            else:
+                yield orjson.loads(data)
+    except requests.exceptions.RequestException as exc:
+        meta["error"] = f"Connection to the API was lost: {exc}"
+
+
+departments = _load_departments(COURSES_FILE.stat().st_mtime_ns if COURSES_FILE.exists() else 0)
 dept_options = ["All departments"] + departments
 
 
@@ -75,22 +115,30 @@ if st.session_state.run_search:
         if dept != "All departments":
             payload["department"] = dept
 
-        with st.spinner("Searching…"):
-            try:
-                resp = requests.post(API_URL, json=payload, timeout=30)
+        meta: dict = {}
+        try:
+            with st.spinner("Searching…"):
+                resp = _http().post(API_URL, json=payload, timeout=30, stream=True)
                 resp.raise_for_status()
-                data = resp.json()
-            except requests.exceptions.ConnectionError:
-                st.error("Cannot reach the API. Start it with: python app/app.py")
-                st.stop()
-            except requests.exceptions.HTTPError as exc:
-                st.error(f"API error: {exc}")
-                st.stop()
+        except requests.exceptions.ConnectionError:
+            st.error("Cannot reach the API. Start it with: python app/app.py")
+            st.stop()
+        except requests.exceptions.HTTPError as exc:
+            st.error(f"API error: {exc}")
+            st.stop()
+        except requests.exceptions.RequestException as exc:
+            st.error(f"Request failed: {exc}")
+            st.stop()
 
         st.subheader("Answer")
-        st.info(data.get("answer", "No answer returned."))
-
-        courses = data.get("courses", [])
+        with resp, st.container(border=True):
+            answer = st.write_stream(_stream_answer(resp, meta))
+        if "error" in meta:
+            st.error(meta["error"])
+        elif not answer:
+            st.info("No answer returned.")
+
+        courses = meta.get("courses", [])
         if courses:
             st.subheader("Retrieved courses")
             rows = [
@@ -0,0 +1,118 @@
+"""
+Micro-batching query encoder.
+
+Concurrent requests each need one query embedding. Encoding them one at a
+time runs the transformer at batch size 1; instead, requests are queued and
+a background task drains the queue every few milliseconds, encoding up to
+MAX_BATCH queries in a single forward pass (in a worker thread, so the
+event loop stays free).
+
+    embedding = await batcher.encode("intro to machine learning")
+
+The worker task is started lazily on the first encode() in each event loop.
+Embeddings of the last CACHE_SIZE distinct query strings (of at most
+QUERY_MEMO_CHARS characters) are kept in an LRU, so repeats (health checks,
+re-submitted searches) skip the forward pass.
+
+Public API:
+    QueryBatcher(encode_fn, max_batch, window, cache_size)
+    QueryBatcher.encode(text) → (1, D) float32 embedding
+    QueryBatcher.close()
+"""
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Callable
+
+import numpy as np
+
+from rag.search import QUERY_MEMO_CHARS, encode_queries
+
+MAX_BATCH  = 32
+WINDOW     = 0.005   # seconds to wait for more queries after the first
+CACHE_SIZE = 2048    # distinct query strings whose embeddings are kept
+
+
+class QueryBatcher:
+    def __init__(
+        self,
+        encode_fn: Callable[[list[str]], np.ndarray] = encode_queries,
+        max_batch: int = MAX_BATCH,
+        window: float = WINDOW,
+        cache_size: int = CACHE_SIZE,
+    ):
+        self.encode_fn  = encode_fn
+        self.max_batch  = max_batch
+        self.window     = window
+        self.cache_size = cache_size
+        self._lru: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[tuple[str, asyncio.Future]] | None = None
+        self._task: asyncio.Task | None = None
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Queue one query and wait for its (1, D) embedding."""
+        if text in self._lru:
+            self._lru.move_to_end(text)
+            return self._lru[text]
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop  = loop
+            self._queue = asyncio.Queue()
+            self._task  = loop.create_task(self._run(self._queue))
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        emb = await future
+        self._remember(text, emb)
+        return emb
+
+    def _remember(self, text: str, emb: np.ndarray) -> None:
+        # Long texts are rarely repeated and would pin up to cache_size large
+        # keys in memory; same cutoff as the query tokeniser memo.
+        if len(text) > QUERY_MEMO_CHARS:
+            return
+        emb.flags.writeable = False   # shared by every later hit
+        self._lru[text] = emb
+        self._lru.move_to_end(text)
+        if len(self._lru) > self.cache_size:
+            self._lru.popitem(last=False)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                embs = await asyncio.to_thread(self.encode_fn, texts)
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            for i, (_, future) in enumerate(batch):
+                if not future.done():   # caller may have disconnected
+                    future.set_result(embs[i : i + 1])
@@ -0,0 +1,116 @@
+"""
+Sparse BM25 (Okapi) scorer.
+
+Same scoring as rank_bm25.BM25Okapi (k1=1.5, b=0.75, idf floored at
+epsilon * mean idf), but laid out as arrays instead of per-document dicts:
+
+    - tokens are mapped to int32 ids once (doc_tokens + doc_offsets)
+    - term frequencies are accumulated into a SciPy CSR matrix
+    - each non-zero is replaced by its final BM25 weight
+
+        W[d, t] = idf[t] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * |d| / avgdl))
+
+W is stored column-major (CSC, the layout bm25s uses), so scoring a query
+gathers only the columns of its terms — a few hundred non-zeros — and sums
+them, rather than a mat-vec over every non-zero in the corpus.
+
+When Numba is installed the column sum is a compiled scatter-add loop over
+the CSC arrays (no SciPy slicing objects, GIL released); otherwise SciPy
+does the gather.
+
+Public API:
+    BM25Index(corpus, k1, b, epsilon)
+    BM25Index.get_scores(tokens, docs=None) → np.ndarray of shape (N,) or (len(docs),)
+"""
+
+from collections.abc import Sequence
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+try:
+    from numba import njit
+except ImportError:   # optional: fall back to SciPy column slicing
+    njit = None
+
+
+if njit is not None:
+    @njit(cache=True, nogil=True)
+    def _sum_columns(indptr, indices, data, terms, counts, n_docs):
+        """scores[d] = sum_j counts[j] * W[d, terms[j]] over a CSC matrix."""
+        out = np.zeros(n_docs, dtype=np.float32)
+        for j in range(len(terms)):
+            t, c = terms[j], counts[j]
+            for p in range(indptr[t], indptr[t + 1]):
+                out[indices[p]] += c * data[p]
+        return out
+else:
+    _sum_columns = None
+
+
+class BM25Index:
+    def __init__(
+        self,
+        corpus: list[list[str]],
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ):
+        n_docs = len(corpus)
+        self.vocab: dict[str, int] = {}
+
+        # --- ragged token-id layout ---
+        doc_tokens = np.fromiter(
+            (self.vocab.setdefault(t, len(self.vocab)) for doc in corpus for t in doc),
+            dtype=np.int32,
+        )
+        doc_offsets = np.zeros(n_docs + 1, dtype=np.int64)
+        np.cumsum([len(doc) for doc in corpus], out=doc_offsets[1:])
+        self.doc_len = np.diff(doc_offsets).astype(np.float32)
+        self.avgdl   = float(self.doc_len.mean()) if n_docs else 0.0
+
+        # --- term frequencies (duplicates summed by the CSR constructor) ---
+        rows = np.repeat(np.arange(n_docs), np.diff(doc_offsets))
+        tf = csr_matrix(
+            (np.ones(len(doc_tokens), dtype=np.float32), (rows, doc_tokens)),
+            shape=(n_docs, len(self.vocab)),
+        )
+        tf.sum_duplicates()
+
+        # --- idf with rank_bm25's epsilon floor for very common terms ---
+        df  = np.bincount(tf.indices, minlength=len(self.vocab))
+        idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+        if len(idf):
+            idf[idf < 0] = epsilon * idf.mean()
+        self.idf = idf.astype(np.float32)
+
+        # --- fold tf, idf and length normalisation into one weight ---
+        if self.avgdl:
+            norm = k1 * (1 - b + b * self.doc_len / self.avgdl)
+            nnz_row = np.repeat(np.arange(n_docs), np.diff(tf.indptr))
+            tf.data = self.idf[tf.indices] * tf.data * (k1 + 1) / (tf.data + norm[nnz_row])
+        self.weights = tf.tocsc()
+
+    def __len__(self) -> int:
+        return self.weights.shape[0]
+
+    def get_scores(self, tokens: Sequence[str], docs: np.ndarray | None = None) -> np.ndarray:
+        """
+        BM25 score of every document for the query tokens (repeats count).
+
+        docs: optional row ids; return only those documents' scores, in that
+            order. The query's columns are still summed over every document
+            (that work is bounded by the terms' non-zeros, not by len(docs)),
+            then the candidates are gathered from the result.
+        """
+        ids = [self.vocab[t] for t in tokens if t in self.vocab]
+        if not ids:
+            return np.zeros(len(self) if docs is None else len(docs), dtype=np.float32)
+        terms, counts = np.unique(ids, return_counts=True)
+        counts = counts.astype(np.float32)
+        w = self.weights
+        if _sum_columns is not None:
+            scores = _sum_columns(w.indptr, w.indices, w.data, terms, counts, len(self))
+        else:
+            scores = w[:, terms] @ counts
+        return scores if docs is None else scores[docs]
@@ -0,0 +1,156 @@
+"""
+Semantic response cache in front of the LLM.
+
+Two tiers, checked in order:
+    1. exact:    LRU dict keyed on (normalised query, department, course code);
+                 queries over QUERY_MEMO_CHARS are keyed on a digest instead
+    2. semantic: IndexFlatIP over prior query embeddings; a hit needs
+                 cosine >= threshold AND the same department / course code,
+                 so "who teaches CSCI0320" never answers "… CSCI0330"
+
+Paraphrased repeats ("CS intro courses" / "intro to computer science
+classes") return the stored answer without calling OpenAI.
+
+The semantic tier is persisted to data/query_cache.index + query_cache.json
+so hits survive restarts. Each file is written to a temp file and renamed
+into place, and the JSON records a digest of the index bytes it was saved
+with, so a crash or two workers saving at once can never pair one worker's
+index with another's entries. The JSON also records the corpus fingerprint
+the answers were generated against; after a re-index, load() starts empty.
+
+Public API:
+    SemanticCache(dim, threshold, max_entries, corpus)
+    SemanticCache.get(text, department, query_emb) → dict | None
+    SemanticCache.put(text, department, query_emb, value)
+    SemanticCache.save(path) / SemanticCache.load(dim, corpus, path)
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+import faiss
+import numpy as np
+import orjson
+
+from rag.search import QUERY_MEMO_CHARS, extract_course_code
+
+DATA_DIR    = Path(__file__).parent.parent / "data"
+INDEX_NAME  = "query_cache.index"
+ENTRY_NAME  = "query_cache.json"
+INDEX_FILE  = DATA_DIR / INDEX_NAME
+ENTRY_FILE  = DATA_DIR / ENTRY_NAME
+
+LRU_SIZE = 1024
+
+
+def _key(text: str, department: str | None) -> tuple[str, str, str]:
+    norm = " ".join(text.lower().split())
+    if len(norm) > QUERY_MEMO_CHARS:
+        # Bound per-key memory: up to LRU_SIZE keys stay resident.
+        norm = _digest(norm.encode())
+    return (norm, (department or "").lower(), extract_course_code(text) or "")
+
+
+class SemanticCache:
+    def __init__(self, dim: int, threshold: float = 0.90, max_entries: int = 10_000,
+                 corpus: str = ""):
+        self.threshold   = threshold
+        self.max_entries = max_entries
+        self.corpus      = corpus   # fingerprint of the metadata answers came from
+        self.index       = faiss.IndexFlatIP(dim)
+        self.entries: list[dict[str, Any]] = []   # parallel to index rows
+        self._lru: OrderedDict[tuple[str, str, str], dict[str, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # ------------------------------------------------------------------
+    # Lookup / insert
+    # ------------------------------------------------------------------
+
+    def get(self, text: str, department: str | None, query_emb: np.ndarray) -> dict | None:
+        """Return the cached value for an equivalent query, or None on a miss."""
+        key = _key(text, department)
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            return self._lru[key]
+
+        if not self.entries:
+            return None
+
+        k = min(8, len(self.entries))
+        qv = query_emb.reshape(1, -1).astype(np.float32, copy=False)
+        scores, ids = self.index.search(qv, k)
+        for score, i in zip(scores[0], ids[0]):
+            if i == -1 or score < self.threshold:
+                break
+            entry = self.entries[i]
+            if (entry["department"], entry["code"]) == key[1:]:
+                self._remember(key, entry["value"])
+                return entry["value"]
+        return None
+
+    def put(self, text: str, department: str | None, query_emb: np.ndarray,
+            value: dict[str, Any]) -> None:
+        key = _key(text, department)
+        self._remember(key, value)
+
+        if len(self.entries) >= self.max_entries:
+            # Drop the oldest quarter; IndexFlat shifts the remaining ids down.
+            n_drop = max(1, self.max_entries // 4)
+            self.index.remove_ids(np.arange(n_drop, dtype=np.int64))
+            del self.entries[:n_drop]
+
+        self.index.add(query_emb.reshape(1, -1).astype(np.float32, copy=False))
+        self.entries.append({"department": key[1], "code": key[2], "value": value})
+
+    def _remember(self, key: tuple[str, str, str], value: dict[str, Any]) -> None:
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        if len(self._lru) > LRU_SIZE:
+            self._lru.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path: Path = DATA_DIR) -> None:
+        path.mkdir(parents=True, exist_ok=True)
+        index_bytes = faiss.serialize_index(self.index).tobytes()
+        _write_atomic(path / INDEX_NAME, index_bytes)
+        _write_atomic(path / ENTRY_NAME, orjson.dumps({
+            "corpus":  self.corpus,
+            "index":   _digest(index_bytes),
+            "entries": self.entries,
+        }))
+
+    @classmethod
+    def load(cls, dim: int, corpus: str = "", path: Path = DATA_DIR, **kwargs) -> "SemanticCache":
+        """Restore the semantic tier from disk; start empty if missing, torn or stale."""
+        cache = cls(dim, corpus=corpus, **kwargs)
+        try:
+            index_bytes = (path / INDEX_NAME).read_bytes()
+            saved = orjson.loads((path / ENTRY_NAME).read_bytes())
+            if saved["corpus"] != corpus or saved["index"] != _digest(index_bytes):
+                return cache
+            index   = faiss.deserialize_index(np.frombuffer(index_bytes, dtype=np.uint8))
+            entries = saved["entries"]
+        except (OSError, RuntimeError, ValueError, KeyError, TypeError):
+            return cache   # missing, truncated or from an older layout
+        if index.d == dim and index.ntotal == len(entries):
+            cache.index, cache.entries = index, entries
+        return cache
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _write_atomic(target: Path, data: bytes) -> None:
+    """Write to a per-process temp file, then rename over target in one step."""
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, target)
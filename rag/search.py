@@ -7,30 +7,57 @@ Scores are normalised to [0, 1] independently then combined:
 alpha=0.5 by default (equal weight). Increase alpha to favour semantic
 matching; decrease to favour keyword matching.
 
+fusion="rrf" swaps min-max for weighted reciprocal rank fusion,
+    final_score = alpha * (k+1)/(k+rank_faiss) + (1 - alpha) * (k+1)/(k+rank_bm25)
+with k=RRF_K and 1-based ranks, scaled so a double first place scores 1.0.
+It ignores score magnitudes, so one outlier cannot flatten the other list.
+
 Also includes exact course-code matching. If a course code is detected in
 the query, exact matches are boosted to rank first.
 
+The fitted BM25 index is pickled to data/bm25.pkl with a hash of the indexed
+fields; HybridSearch loads it instead of re-tokenising when the hash matches.
+
 Public API:
-    HybridSearch(store, courses)
-    HybridSearch.query(text, top_k, alpha, filters) → list[dict]
+    encode_query(text) → (1, D) float32 query embedding
+    encode_queries(texts) → (N, D) float32 query embeddings
+    save_bm25(courses) / load_bm25(courses) → BM25Index | None
+    HybridSearch(store, bm25=None)
+    HybridSearch.query(text, top_k, alpha, filters, query_emb, fusion) → list[dict]
+    HybridSearch.query_batch(texts, top_k, alpha, filters, query_embs, fusion)
 """
 
+import functools
+import hashlib
+import os
+import pickle
 import re
 import numpy as np
-from rank_bm25 import BM25Okapi
+import orjson
+import torch
+from pathlib import Path
 from typing import Any
 
-from rag.embedder import MODEL_NAME, SentenceTransformer
+from rag.bm25 import BM25Index
+from rag.embedder import get_model
 from rag.vector_store import VectorStore
 
-_model: SentenceTransformer | None = None
+DATA_DIR  = Path(__file__).parent.parent / "data"
+BM25_NAME = "bm25.pkl"
+BM25_FILE = DATA_DIR / BM25_NAME
+
+
+def encode_queries(texts: list[str]) -> np.ndarray:
+    """Return L2-normalised (N, D) float32 embeddings for a batch of queries."""
+    with torch.inference_mode():
+        embs = get_model().encode(texts, batch_size=len(texts) or 1,
+                                  normalize_embeddings=True, convert_to_numpy=True)
+    return embs.astype(np.float32, copy=False)
 
 
-def _get_model() -> SentenceTransformer:
-    global _model
-    if _model is None:
-        _model = SentenceTransformer(MODEL_NAME)
-    return _model
+def encode_query(text: str) -> np.ndarray:
+    """Return the L2-normalised (1, D) float32 embedding of a query string."""
+    return encode_queries([text])
 
 
 def _normalise(scores: np.ndarray) -> np.ndarray:
@@ -41,10 +68,48 @@ def _normalise(scores: np.ndarray) -> np.ndarray:
     return (scores - lo) / (hi - lo)
 
 
+RRF_K = 60   # standard reciprocal-rank-fusion damping constant
+
+
+def _reciprocal_rank(scores: np.ndarray, k: int = RRF_K) -> np.ndarray:
+    """Map scores to (k+1)/(k+rank), rank 1 = highest; the top item gets 1.0."""
+    ranks = np.empty(len(scores), dtype=np.float32)
+    ranks[np.argsort(-scores, kind="stable")] = np.arange(1, len(scores) + 1)
+    return (k + 1) / (k + ranks)
+
+
 def _tokenise(text: str) -> list[str]:
     return text.lower().split()
 
 
+# Only short queries are memoised: the key is the raw text, so caching
+# arbitrarily long inputs could pin hundreds of MB per worker.
+QUERY_MEMO_CHARS = 256
+
+
+@functools.lru_cache(maxsize=4096)
+def _memo_tokens(text: str) -> tuple[str, ...]:
+    return tuple(_tokenise(text))
+
+
+def _query_tokens(text: str) -> tuple[str, ...]:
+    """
+    _tokenise for queries, memoised up to QUERY_MEMO_CHARS. Returns a tuple so
+    cached hits can't be mutated.
+    """
+    if len(text) > QUERY_MEMO_CHARS:
+        return tuple(_tokenise(text))
+    return _memo_tokens(text)
+
+
+# Match: 2-4 letters, optional space, 4 digits
+_COURSE_CODE_RE = re.compile(r'([A-Za-z]{2,4})\s*(\d{4})')
+# Prefilter: a plain digit-run scan rejects most queries (no code at all)
+# without the letter-class backtracking at every position.
+_DIGITS_RE      = re.compile(r'\d{4}')
+CODE_SCAN_CHARS = 512   # course codes sit in the question, not kilobytes in
+
+
 def extract_course_code(query: str) -> str | None:
     """
     Extract a course code from the query (e.g., ENGN0030, AMST2920, CSCI0320).
@@ -54,10 +119,13 @@ def extract_course_code(query: str) -> str | None:
     - ENGN 0030 (with space)
     - engn0030 (lowercase)
     
+    Only the first CODE_SCAN_CHARS characters are scanned.
     Returns the normalized uppercase format or None if not found.
     """
-    # Match: 2-4 letters, optional space, 4 digits
-    match = re.search(r'([A-Za-z]{2,4})\s*(\d{4})', query)
+    query = query[:CODE_SCAN_CHARS]
+    if not _DIGITS_RE.search(query):
+        return None
+    match = _COURSE_CODE_RE.search(query)
     if match:
         return (match.group(1) + match.group(2)).upper()
     return None
@@ -68,35 +136,74 @@ def normalize_course_code(code: str) -> str:
     return code.replace(" ", "").upper()
 
 
+# Course fields indexed by BM25, in the order they are concatenated.
+_BM25_FIELDS = ("course_code", "title", "description", "department",
+                "instructor", "meeting_times", "prerequisites", "source")
+
+
+# Bump when BM25Index's pickled layout changes so older bm25.pkl files refit.
+_BM25_CACHE_VERSION = 2
+
+
+def _corpus_hash(courses: list[dict]) -> str:
+    """Fingerprint of exactly the fields BM25 indexes (plus the cache layout)."""
+    fields = [[c.get(key) for key in _BM25_FIELDS] for c in courses]
+    return hashlib.sha256(orjson.dumps([_BM25_CACHE_VERSION, fields])).hexdigest()
+
+
+def build_bm25(courses: list[dict]) -> BM25Index:
+    # BM25 corpus covers all course fields (not just title/description)
+    corpus = [
+        _tokenise(" ".join(v for key in _BM25_FIELDS if (v := c.get(key))))
+        for c in courses
+    ]
+    return BM25Index(corpus)
+
+
+def save_bm25(courses: list[dict], path: Path = BM25_FILE) -> BM25Index:
+    """Fit BM25 over courses and pickle it next to the FAISS index."""
+    bm25 = build_bm25(courses)
+    path.parent.mkdir(exist_ok=True)
+    # Temp file + rename, so a crash mid-dump never leaves a truncated pickle
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump((_corpus_hash(courses), bm25), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return bm25
+
+
+def load_bm25(courses: list[dict], path: Path = BM25_FILE) -> BM25Index | None:
+    """Return the pickled BM25 index if it was fitted on these courses, else None."""
+    try:
+        with open(path, "rb") as f:
+            digest, bm25 = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError,
+            ImportError, ValueError, TypeError):
+        return None   # missing, truncated, or pickled by an incompatible version
+    return bm25 if digest == _corpus_hash(courses) else None
+
+
 class HybridSearch:
-    def __init__(self, store: VectorStore):
+    def __init__(self, store: VectorStore, bm25: BM25Index | None = None):
         self.store   = store
         self.courses = store.courses
-        
-        # Build BM25 corpus with all course fields (not just title/description)
-        corpus = []
-        for c in self.courses:
-            text_parts = []
-            if c.get('course_code'):
-                text_parts.append(c['course_code'])
-            if c.get('title'):
-                text_parts.append(c['title'])
-            if c.get('description'):
-                text_parts.append(c['description'])
-            if c.get('department'):
-                text_parts.append(c['department'])
-            if c.get('instructor'):
-                text_parts.append(c['instructor'])
-            if c.get('meeting_times'):
-                text_parts.append(c['meeting_times'])
-            if c.get('prerequisites'):
-                text_parts.append(c['prerequisites'])
-            if c.get('source'):
-                text_parts.append(c['source'])
-            
-            corpus.append(_tokenise(" ".join(text_parts)))
-        
-        self.bm25 = BM25Okapi(corpus)
+
+        # Prebuilt → cached next to the loaded index → fit now, re-caching a
+        # stale or unreadable pickle so the next start doesn't refit again
+        if bm25 is None and store.path is not None:
+            path = store.path / BM25_NAME
+            bm25 = load_bm25(self.courses, path)
+            if bm25 is None:
+                bm25 = save_bm25(self.courses, path)
+        if bm25 is None:
+            bm25 = build_bm25(self.courses)
+        self.bm25 = bm25
+
+        # Normalised course code → row ids (ascending), for O(1) exact matching
+        self._code_to_ids: dict[str, list[int]] = {}
+        for i, c in enumerate(self.courses):
+            if code := c.get("course_code"):
+                self._code_to_ids.setdefault(normalize_course_code(code), []).append(i)
 
     def query(
         self,
@@ -104,6 +211,8 @@ class HybridSearch:
         top_k: int = 10,
         alpha: float = 0.5,
         filters: dict[str, Any] | None = None,
+        query_emb: np.ndarray | None = None,
+        fusion: str = "cc",
     ) -> tuple[list[dict[str, Any]], str | None]:
         """
         Hybrid search over all courses with exact course-code matching.
@@ -114,6 +223,9 @@ class HybridSearch:
             alpha:   weight for FAISS score (1-alpha goes to BM25)
             filters: equality filters applied to metadata before ranking
                      e.g. {"department": "Computer Science"}
+            query_emb: precomputed encode_query(text), if the caller has it
+            fusion:  "cc" (min-max convex combination) or "rrf"
+                     (reciprocal rank fusion)
 
         Returns:
             tuple of (
@@ -122,51 +234,94 @@ class HybridSearch:
                 detected course code (or None)
             )
         """
-        # Detect course code in query
-        detected_code = extract_course_code(text)
-        
+        qv = encode_query(text) if query_emb is None else query_emb
+        return self.query_batch([text], top_k, alpha, filters, qv, fusion)[0]
+
+    def query_batch(
+        self,
+        texts: list[str],
+        top_k: int = 10,
+        alpha: float = 0.5,
+        filters: dict[str, Any] | None = None,
+        query_embs: np.ndarray | None = None,
+        fusion: str = "cc",
+    ) -> list[tuple[list[dict[str, Any]], str | None]]:
+        """
+        query() for many texts sharing the same filters.
+
+        All texts are encoded in one forward pass (unless query_embs, an
+        (B, D) array, is given) and scored against the corpus with a single
+        (N, D) @ (D, B) matrix product. Returns one query() result per text.
+        """
+        if not texts:
+            return []
+
         # Apply metadata filter to get candidate indices
         if filters:
-            candidate_idx = [
-                i for i, c in enumerate(self.courses)
-                if all(c.get(k, "").lower() == v.lower() for k, v in filters.items())
-            ]
+            candidate_idx = self.store.filter_ids(filters)
         else:
-            candidate_idx = list(range(len(self.courses)))
+            candidate_idx = np.arange(len(self.courses))
+
+        if not len(candidate_idx):
+            return [([], extract_course_code(text)) for text in texts]
 
-        if not candidate_idx:
-            return [], detected_code
+        # --- FAISS scores: one GEMM for the whole batch ---
+        qvs = encode_queries(texts) if query_embs is None else query_embs
+        embs = self.store.embeddings
+        sub_embs = embs[candidate_idx] if filters else embs   # no copy when unfiltered
+        faiss_all = sub_embs @ qvs.T   # (N_candidates, B) cosine similarity
 
-        # --- FAISS scores ---
-        qv = _get_model().encode([text], normalize_embeddings=True).astype(np.float32)
-        sub_embs = np.stack([self.store.index.reconstruct(i) for i in candidate_idx])
-        faiss_raw = (sub_embs @ qv.T).flatten()   # cosine similarity
+        return [
+            self._rank(text, faiss_all[:, j], candidate_idx, bool(filters), top_k, alpha, fusion)
+            for j, text in enumerate(texts)
+        ]
+
+    def _rank(
+        self,
+        text: str,
+        faiss_raw: np.ndarray,
+        candidate_idx: np.ndarray,
+        filtered: bool,
+        top_k: int,
+        alpha: float,
+        fusion: str,
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        """BM25-score one query, fuse with its FAISS scores and take top-k."""
+        # Detect course code in query
+        detected_code = extract_course_code(text)
 
         # --- BM25 scores ---
-        tokens = _tokenise(text)
-        all_bm25 = self.bm25.get_scores(tokens)
-        bm25_raw = np.array([all_bm25[i] for i in candidate_idx])
+        tokens = _query_tokens(text)
+        bm25_raw = self.bm25.get_scores(tokens, candidate_idx if filtered else None)
 
         # --- Fuse ---
-        faiss_norm = _normalise(faiss_raw)
-        bm25_norm  = _normalise(bm25_raw)
+        if fusion == "rrf":
+            faiss_norm = _reciprocal_rank(faiss_raw)
+            bm25_norm  = _reciprocal_rank(bm25_raw)
+        elif fusion == "cc":
+            faiss_norm = _normalise(faiss_raw)
+            bm25_norm  = _normalise(bm25_raw)
+        else:
+            raise ValueError(f"unknown fusion {fusion!r}; expected 'cc' or 'rrf'")
         hybrid     = alpha * faiss_norm + (1 - alpha) * bm25_norm
 
         # --- Exact course-code matching (if detected) ---
         exact_match_idx = None
-        if detected_code:
-            for local_id, global_id in enumerate(candidate_idx):
-                course_code = normalize_course_code(
-                    self.courses[global_id].get('course_code', '')
-                )
-                if course_code == detected_code:
-                    # Strong boost to hybrid score for exact match
-                    exact_match_idx = local_id
-                    hybrid[local_id] = 1.0  # Maximum score
-                    break
-
-        # Sort and take top-k
-        top_local = np.argsort(hybrid)[::-1][:top_k]
+        for global_id in self._code_to_ids.get(detected_code or "", ()):
+            # candidate_idx is sorted, so its position is the local id
+            local_id = int(np.searchsorted(candidate_idx, global_id))
+            if local_id < len(candidate_idx) and candidate_idx[local_id] == global_id:
+                # Strong boost to hybrid score for exact match
+                exact_match_idx = local_id
+                hybrid[local_id] = 1.0  # Maximum score
+                break
+
+        # Take top-k: partition in O(N), then sort only those k
+        if top_k < len(hybrid):
+            part = np.argpartition(-hybrid, top_k)[:top_k]
+            top_local = part[np.argsort(-hybrid[part])]
+        else:
+            top_local = np.argsort(-hybrid)
 
         results = []
         for local_id in top_local:
@@ -175,7 +330,7 @@ class HybridSearch:
             course["_faiss_score"]  = float(faiss_norm[local_id])
             course["_bm25_score"]   = float(bm25_norm[local_id])
             course["_hybrid_score"] = float(hybrid[local_id])
-            course["_exact_match"]  = (local_id == exact_match_idx)
+            course["_exact_match"]  = bool(local_id == exact_match_idx)
             results.append(course)
 
         return results, detected_code
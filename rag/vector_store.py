@@ -1,29 +1,148 @@
 """
 FAISS vector store.
 
-Builds a IndexFlatIP (inner-product) index over L2-normalised embeddings,
-which is equivalent to cosine similarity search.
+Builds an inner-product index over L2-normalised embeddings, which is
+equivalent to cosine similarity search:
+
+    - up to HNSW_MIN courses (the whole catalog): IndexFlatIP — an exact
+      scan of ~11k vectors takes under a millisecond, and the hybrid
+      path scores store.embeddings with its own GEMM anyway
+    - larger corpora: IndexHNSWFlat — walks a proximity graph instead of
+      scanning every vector
+
+Indexes written by older builds (HNSW, IVF-PQ) still load. When a CUDA build of FAISS
+sees a GPU, load() mirrors the index onto device 0 for search; the CPU index
+stays in `cpu_index` for save().
+
+Both index types keep exact float32 vectors in an IndexFlat (the index
+itself or the HNSW storage), so the store exposes them as one contiguous
+(N, D) `embeddings` matrix: a read-only NumPy view of that flat storage.
+After load() that storage is the IO_FLAG_MMAP_IFC file mapping, so the view
+is the file's pages, shared between API workers; after build() it is the
+freshly added heap copy. Other index types (older IVF-PQ files) are
+reconstructed into a private copy. Filtered and hybrid scoring gather rows
+from it with fancy indexing instead of one reconstruct() SWIG call per
+course.
 
 Public API:
-    build(embeddings, courses)  → VectorStore
+    build(embeddings, courses)  → VectorStore   (also VectorStore.build)
     VectorStore.search(query_emb, top_k, filters) → list[dict]
-    VectorStore.save() / VectorStore.load()
+    VectorStore.search_semantic(text, k, filters) → list[dict]
+    VectorStore.filter_ids(filters) → np.ndarray of row ids
+    VectorStore.save(path) / VectorStore.load(path)   (path defaults to data/)
 """
 
-import json
+import threading
 import numpy as np
 import faiss
+import orjson
 from pathlib import Path
 
+from rag.embedder import course_to_context
+
 DATA_DIR    = Path(__file__).parent.parent / "data"
-INDEX_FILE  = DATA_DIR / "faiss.index"
-META_FILE   = DATA_DIR / "metadata.json"
+INDEX_NAME  = "faiss.index"
+META_NAME   = "metadata.json"
+INDEX_FILE  = DATA_DIR / INDEX_NAME
+META_FILE   = DATA_DIR / META_NAME
+
+HNSW_M          = 32    # graph neighbours per node
+EF_CONSTRUCTION = 200   # build-time beam width (higher = better graph)
+EF_SEARCH       = 64    # query-time beam width (higher = better recall)
+
+HNSW_MIN        = 100_000   # below this an exact flat scan is fast enough
+
+# Map the flat vector storage straight from the file. Plain IO_FLAG_MMAP only
+# maps the file while parsing and still copies IndexFlat vectors onto the
+# heap; IO_FLAG_MMAP_IFC leaves IndexFlatCodes data (IndexFlatIP and HNSW
+# storage) in a read-only shared mapping, so pages come from the OS page
+# cache on demand and are shared between API workers.
+READ_FLAGS = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+# Process-wide cache so repeated load() calls (app re-imports, lifespan
+# restarts, tests) reuse the mapped index. Keyed by path + mtime so a
+# rebuilt index on disk is picked up.
+_INDEX_CACHE: dict[tuple[Path, int], faiss.Index] = {}
+_INDEX_LOCK = threading.Lock()
+
+_NO_IDS = np.empty(0, dtype=np.int64)
+
+
+def _read_index(path: Path) -> faiss.Index:
+    key = (path.resolve(), path.stat().st_mtime_ns)
+    with _INDEX_LOCK:
+        if key not in _INDEX_CACHE:
+            _INDEX_CACHE[key] = _tune(faiss.read_index(str(path), READ_FLAGS))
+        return _INDEX_CACHE[key]
+
+
+def _flat_vectors(index: faiss.Index) -> np.ndarray:
+    """(N, D) float32 view of the index's exact vectors (copy as a fallback)."""
+    if isinstance(index, faiss.IndexHNSW):
+        flat = faiss.downcast_index(index.storage)
+    else:
+        flat = index
+    if not isinstance(flat, faiss.IndexFlat):
+        return index.reconstruct_n(0, index.ntotal)
+    # Borrowed pointer into the index's storage (a read-only file mapping for
+    # loaded indexes, so it must never be written): valid while the index is
+    # alive, which VectorStore guarantees by holding it.
+    view = faiss.rev_swig_ptr(flat.get_xb(), flat.ntotal * flat.d).reshape(flat.ntotal, flat.d)
+    view.flags.writeable = False
+    return view
+
+
+def _tune(index: faiss.Index) -> faiss.Index:
+    """Apply query-time parameters to a freshly built or loaded index."""
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = EF_SEARCH
+    return index
 
 
 class VectorStore:
     def __init__(self, index: faiss.Index, courses: list[dict]):
-        self.index   = index
-        self.courses = courses   # parallel to index rows
+        self.index     = index
+        self.cpu_index = index
+        self.gpu_res   = None      # keeps GPU memory alive while self.index uses it
+        self.courses   = courses   # parallel to index rows
+        self.path: Path | None = None   # directory load() read from; None if built
+        # float32 on purpose: NumPy has no half-precision BLAS, so a float16
+        # copy would be upcast on every query (~10x slower scoring). The
+        # on-disk embeddings.npy is already float16.
+        self.embeddings = _flat_vectors(index)   # (N, D) float32, read-only
+        # field → lowercased value → sorted row ids (built per field on first use)
+        self._postings: dict[str, dict[str, np.ndarray]] = {}
+
+    def _field_postings(self, field: str) -> dict[str, np.ndarray]:
+        if field not in self._postings:
+            rows: dict[str, list[int]] = {}
+            for i, c in enumerate(self.courses):
+                rows.setdefault((c.get(field) or "").lower(), []).append(i)
+            postings = {v: np.asarray(ids, dtype=np.int64) for v, ids in rows.items()}
+            for arr in postings.values():
+                arr.flags.writeable = False   # handed straight to callers
+            self._postings[field] = postings
+        return self._postings[field]
+
+    def filter_ids(self, filters: dict[str, str]) -> np.ndarray:
+        """Sorted row ids whose fields equal every filter value (case-insensitive)."""
+        ids = None
+        for field, value in filters.items():
+            match = self._field_postings(field).get(value.lower(), _NO_IDS)
+            ids = match if ids is None else np.intersect1d(ids, match, assume_unique=True)
+        return np.arange(len(self.courses)) if ids is None else ids
+
+    def _to_gpu(self) -> None:
+        """Move search onto GPU 0 if available; keep the CPU index otherwise."""
+        if not hasattr(faiss, "StandardGpuResources") or faiss.get_num_gpus() == 0:
+            return
+        try:
+            res = faiss.StandardGpuResources()
+            self.index = _tune(faiss.index_cpu_to_gpu(res, 0, self.cpu_index))
+            self.gpu_res = res
+        except RuntimeError:
+            # Index types without a GPU implementation (e.g. HNSW) stay on CPU.
+            self.index = self.cpu_index
 
     # ------------------------------------------------------------------
     # Search
@@ -42,26 +161,27 @@ class VectorStore:
             e.g. {"department": "Computer Science"}
             Only equality matching; multiple filters are ANDed.
         """
-        # Build candidate set (filtered or all)
-        if filters:
-            candidate_idx = [
-                i for i, c in enumerate(self.courses)
-                if all(c.get(k, "").lower() == v.lower() for k, v in filters.items())
-            ]
+        qv = query_emb.reshape(1, -1).astype(np.float32, copy=False)
+
+        # Unfiltered: search the full index directly (GPU when available)
+        if not filters:
+            k = min(top_k, len(self.courses))
+            if k == 0:
+                return []
+            scores, local_ids = self.index.search(qv, k)
+            candidate_idx = range(len(self.courses))
         else:
-            candidate_idx = list(range(len(self.courses)))
-
-        if not candidate_idx:
-            return []
-
-        # Extract sub-matrix and search
-        sub_embs = np.stack([self.index.reconstruct(i) for i in candidate_idx])
-        sub_index = faiss.IndexFlatIP(sub_embs.shape[1])
-        sub_index.add(sub_embs)
-
-        k = min(top_k, len(candidate_idx))
-        qv = query_emb.reshape(1, -1).astype(np.float32)
-        scores, local_ids = sub_index.search(qv, k)
+            candidate_idx = self.filter_ids(filters)
+            if not len(candidate_idx):
+                return []
+
+            # Exact scores over the candidate rows: one gather + GEMV, no
+            # per-query FAISS index to allocate and fill.
+            sims = self.embeddings[candidate_idx] @ qv[0]
+            k = min(top_k, len(candidate_idx))
+            top = np.argpartition(-sims, k - 1)[:k]
+            top = top[np.argsort(-sims[top])]
+            scores, local_ids = sims[top][None], top[None]
 
         results = []
         for score, local_id in zip(scores[0], local_ids[0]):
@@ -72,20 +192,37 @@ class VectorStore:
             results.append(course)
         return results
 
+    def search_semantic(
+        self,
+        text: str,
+        k: int = 10,
+        filters: dict | None = None,
+    ) -> list[dict]:
+        """search() for a query string: encode it, then return the top k courses."""
+        from rag.search import encode_query   # rag.search imports this module
+        return self.search(encode_query(text), top_k=k, filters=filters)
+
     # ------------------------------------------------------------------
     # Persistence
     # ------------------------------------------------------------------
 
-    def save(self) -> None:
-        DATA_DIR.mkdir(exist_ok=True)
-        faiss.write_index(self.index, str(INDEX_FILE))
-        META_FILE.write_text(json.dumps(self.courses, ensure_ascii=False), encoding="utf-8")
+    @classmethod
+    def build(cls, embeddings: np.ndarray, courses: list[dict]) -> "VectorStore":
+        return build(embeddings, courses)
+
+    def save(self, path: Path = DATA_DIR) -> None:
+        path.mkdir(parents=True, exist_ok=True)
+        faiss.write_index(self.cpu_index, str(path / INDEX_NAME))
+        (path / META_NAME).write_bytes(orjson.dumps(self.courses))
 
     @classmethod
-    def load(cls) -> "VectorStore":
-        index   = faiss.read_index(str(INDEX_FILE))
-        courses = json.loads(META_FILE.read_text(encoding="utf-8"))
-        return cls(index, courses)
+    def load(cls, path: Path = DATA_DIR) -> "VectorStore":
+        index   = _read_index(path / INDEX_NAME)
+        courses = orjson.loads((path / META_NAME).read_bytes())
+        store   = cls(index, courses)
+        store.path = path
+        store._to_gpu()
+        return store
 
 
 # ------------------------------------------------------------------
@@ -93,8 +230,17 @@ class VectorStore:
 # ------------------------------------------------------------------
 
 def build(embeddings: np.ndarray, courses: list[dict]) -> VectorStore:
-    """Build an IndexFlatIP from a (N, D) float32 embedding matrix."""
-    dim   = embeddings.shape[1]
-    index = faiss.IndexFlatIP(dim)
-    index.add(embeddings.astype(np.float32))
-    return VectorStore(index, courses)
+    """Build an inner-product index from a (N, D) float32 embedding matrix."""
+    # Copies, so the caller's dicts stay clean; the store's records carry the
+    # pre-rendered block into metadata.json.
+    courses = [{**c, "_context_block": course_to_context(c)} for c in courses]
+
+    n, dim = embeddings.shape
+    embeddings = embeddings.astype(np.float32, copy=False)
+    if n < HNSW_MIN:
+        index = faiss.IndexFlatIP(dim)
+    else:
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = EF_CONSTRUCTION
+    index.add(embeddings)
+    return VectorStore(_tune(index), courses)
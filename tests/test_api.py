@@ -148,3 +148,63 @@ class TestAPIErrorHandling:
             # Should handle without crashing
             assert response.status_code in [200, 400, 500]
 
+
+class TestTemplatedAnswer:
+    """Test direct code lookups answered without the LLM."""
+
+    COURSE = {
+        "course_code": "APMA2680",
+        "title": "Fluid Dynamics",
+        "instructor": "J. Doe",
+        "meeting_times": "TTh 10:30-11:50",
+        "prerequisites": "",
+    }
+
+    def test_instructor_and_schedule_lookup(self):
+        """Test that 'who teaches … when does it meet' is answered from the record."""
+        from app.app import _templated_answer
+        answer = _templated_answer(
+            "Who teaches APMA2680, and when does the class meet?", [self.COURSE], "APMA2680"
+        )
+        assert answer == "APMA2680 (Fluid Dynamics) is taught by J. Doe and meets TTh 10:30-11:50."
+
+    def test_missing_prerequisites_are_stated(self):
+        """Test that an empty prerequisite field is reported, not invented."""
+        from app.app import _templated_answer
+        answer = _templated_answer("What are the prereqs for APMA 2680?", [self.COURSE], "APMA2680")
+        assert answer == "No prerequisites are listed for APMA2680."
+
+    def test_scraped_prerequisite_label_is_not_repeated(self):
+        """Test that a leading "Prerequisite:" in the record is dropped before templating."""
+        from app.app import _templated_answer
+        course = {**self.COURSE, "prerequisites": "Prerequisite: APMA 0350."}
+        answer = _templated_answer("What are the prereqs for APMA2680?", [course], "APMA2680")
+        assert answer == "APMA2680 (Fluid Dynamics) lists these prerequisites: APMA 0350."
+
+    def test_falls_through_to_llm(self):
+        """Test that open-ended or mismatched queries are left to the LLM."""
+        from app.app import _templated_answer
+        assert _templated_answer("Find a course similar to APMA2680", [self.COURSE], "APMA2680") is None
+        assert _templated_answer("Who teaches CSCI0320?", [self.COURSE], "CSCI0320") is None
+        assert _templated_answer("Tell me about APMA2680", [self.COURSE], "APMA2680") is None
+
+    def test_reverse_questions_fall_through(self):
+        """Test that questions about other courses' relation to the code are not templated."""
+        from app.app import _templated_answer
+        for q in (
+            "What courses list APMA 2680 as a prerequisite?",
+            "Which courses have APMA2680 as a prereq?",
+            "What does the professor of APMA2680 teach next semester?",
+            "Is the APMA2680 instructor teaching anything else?",
+        ):
+            assert _templated_answer(q, [self.COURSE], "APMA2680") is None, q
+
+    def test_compound_questions_fall_through(self):
+        """Test that a lookup joined to a non-lookup clause or another course goes to the LLM."""
+        from app.app import _templated_answer
+        for q in (
+            "Who teaches APMA2680 and what courses require it?",
+            "Who teaches APMA2680 and CSCI0320?",
+            "When does APMA2680 meet, and who teaches CSCI0320?",
+        ):
+            assert _templated_answer(q, [self.COURSE], "APMA2680") is None, q
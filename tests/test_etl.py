@@ -106,3 +106,38 @@ class TestPipelineLogic:
                 merged_dict[code] = course
         
         return list(merged_dict.values())
+
+
+class TestNormalizeCode:
+    """Test course code canonicalisation used by the merge."""
+
+    def test_removes_spaces_and_uppercases(self):
+        """Test that spacing and case variants collapse to one code."""
+        from etl.pipeline import normalize_code
+        assert normalize_code("csci 0320") == "CSCI0320"
+        assert normalize_code(" CsCi0320 ") == "CSCI0320"
+
+    def test_removes_tabs_nbsp_and_underscores(self):
+        """Test that scraped separators other than a plain space are dropped."""
+        from etl.pipeline import normalize_code
+        assert normalize_code("CSCI\xa00320") == "CSCI0320"
+        assert normalize_code("csci_0320\n") == "CSCI0320"
+        assert normalize_code("CSCI\t0320") == "CSCI0320"
+
+    def test_suffixed_and_mixed_separator_codes(self):
+        """Test that letter suffixes survive and mixed separators are all dropped."""
+        from etl.pipeline import normalize_code
+        assert normalize_code("CSCI0320") == "CSCI0320"
+        assert normalize_code("csci 1951a") == "CSCI1951A"
+        assert normalize_code(" csci\xa0_1951a\r\n") == "CSCI1951A"
+
+    def test_merge_matches_across_formats(self):
+        """Test that the real merge joins 'ENGN 0010' with 'engn0010'."""
+        from etl.pipeline import merge_courses
+        merged = merge_courses(
+            cab=[{"course_code": "engn0010", "prerequisites": "High School Math"}],
+            bulletin=[{"course_code": "ENGN 0010", "title": "Intro", "source": "Bulletin"}],
+        )
+        assert len(merged) == 1
+        assert merged[0]["course_code"] == "ENGN0010"
+        assert merged[0]["source"] == "CAB+Bulletin"
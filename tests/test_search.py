@@ -68,7 +68,40 @@ class TestCourseCodeNormalization:
         assert normalized == "CSCI0320"
 
 
-@pytest.fixture
+class TestReciprocalRank:
+    """Test the rank transform used by fusion="rrf"."""
+
+    def test_top_item_scores_one(self):
+        """Test that the best score maps to 1.0 and order is preserved."""
+        import numpy as np
+        from rag.search import _reciprocal_rank
+        rr = _reciprocal_rank(np.array([0.2, 0.9, 0.5]), k=60)
+        assert rr[1] == 1.0
+        assert rr[1] > rr[2] > rr[0]
+
+    def test_ignores_score_magnitude(self):
+        """Test that an outlier does not change the fused values."""
+        import numpy as np
+        from rag.search import _reciprocal_rank
+        np.testing.assert_array_equal(_reciprocal_rank(np.array([1.0, 2.0, 3.0])),
+                                      _reciprocal_rank(np.array([1.0, 2.0, 300.0])))
+
+
+class TestQueryTokens:
+    """Test the memoised query tokenizer."""
+
+    def test_long_queries_are_not_memoised(self):
+        """Test that only queries up to QUERY_MEMO_CHARS enter the LRU."""
+        from rag.search import QUERY_MEMO_CHARS, _memo_tokens, _query_tokens
+        _memo_tokens.cache_clear()
+        long_query = "word " * QUERY_MEMO_CHARS
+
+        assert _query_tokens("Intro CS") == ("intro", "cs")
+        assert _query_tokens(long_query) == ("word",) * QUERY_MEMO_CHARS
+        assert _memo_tokens.cache_info().currsize == 1
+
+
+@pytest.fixture(scope="session")
 def sample_courses():
     """Load sample courses for testing."""
     return [
@@ -115,19 +148,20 @@ def sample_courses():
     ]
 
 
-@pytest.fixture
-def vector_store(sample_courses, tmp_path):
-    """Create a test vector store."""
+@pytest.fixture(scope="session")
+def vector_store(sample_courses, tmp_path_factory):
+    """Create a test vector store (embedded and built once per session)."""
     from rag.embedder import run as run_embedder
     
     # Generate embeddings for sample courses
     embeddings, _ = run_embedder(courses=sample_courses)
     
     # Create and save store
+    path = tmp_path_factory.mktemp("vector_store")
     store = VectorStore.build(embeddings, sample_courses)
-    store.save(path=tmp_path)
+    store.save(path=path)
     
-    return VectorStore.load(path=tmp_path)
+    return VectorStore.load(path=path)
 
 
 class TestVectorStore:
@@ -155,6 +189,29 @@ class TestVectorStore:
         for course in results:
             assert course["department"] == "Computer Science"
 
+    def test_build_leaves_input_courses_untouched(self, sample_courses):
+        """Test that build() renders context blocks on copies, not the caller's dicts."""
+        import numpy as np
+        courses = [dict(c) for c in sample_courses]
+        store = VectorStore.build(np.eye(len(courses), 8, dtype=np.float32), courses)
+
+        assert all("_context_block" not in c for c in courses)
+        assert all(c["_context_block"] for c in store.courses)
+
+    @pytest.mark.skipif(not Path("/proc/self/maps").exists(), reason="needs Linux /proc")
+    def test_loaded_vectors_are_file_backed(self, vector_store):
+        """Test that loaded embeddings are a shared mapping of faiss.index, not a heap copy."""
+        addr = vector_store.embeddings.__array_interface__["data"][0]
+        for line in Path("/proc/self/maps").read_text().splitlines():
+            fields = line.split()
+            lo, hi = (int(x, 16) for x in fields[0].split("-"))
+            if lo <= addr < hi:
+                assert fields[1].endswith("s")   # shared, not private rw-p heap
+                assert fields[-1].endswith("faiss.index")
+                break
+        else:
+            pytest.fail("embeddings address not in any mapping")
+
 
 class TestHybridSearch:
     """Test hybrid search (FAISS + BM25) with exact code matching."""
@@ -238,6 +295,19 @@ class TestHybridSearch:
             assert "_hybrid_score" in course
             assert 0 <= course["_hybrid_score"] <= 1
     
+    def test_query_batch_matches_query(self, sample_courses, vector_store):
+        """Test that batched queries return the same rankings as one-by-one."""
+        search = HybridSearch(vector_store)
+        texts = ["programming", "Who teaches ENGN0030?"]
+
+        batched = search.query_batch(texts, top_k=3)
+
+        assert len(batched) == 2
+        for text, (results, code) in zip(texts, batched):
+            single, single_code = search.query(text, top_k=3)
+            assert code == single_code
+            assert [c["course_code"] for c in results] == [c["course_code"] for c in single]
+    
     def test_exact_match_marked_in_results(self, sample_courses, vector_store):
         """Test that exact match is marked in course result."""
         search = HybridSearch(vector_store)
@@ -294,3 +364,316 @@ class TestSearchIntegration:
         # Should have empty string or valid value, not KeyError
         assert "instructor" in math_course
 
+
+class TestSemanticCache:
+    """Test the two-tier semantic response cache."""
+
+    @staticmethod
+    def _vec(seed: int, dim: int = 8):
+        import numpy as np
+        v = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+        return v / np.linalg.norm(v)
+
+    def test_exact_repeat_hits(self):
+        """Test that a repeated query (modulo case/whitespace) is a hit."""
+        from rag.cache import SemanticCache
+        cache = SemanticCache(dim=8)
+        cache.put("Intro CS courses", None, self._vec(0), {"answer": "a"})
+
+        assert cache.get("  intro cs   COURSES ", None, self._vec(1)) == {"answer": "a"}
+
+    def test_long_query_key_is_digested(self):
+        """Test that an over-long query is keyed on a short digest and still hits."""
+        from rag.cache import SemanticCache
+        from rag.search import QUERY_MEMO_CHARS
+        cache = SemanticCache(dim=8)
+        text = "intro cs courses " * QUERY_MEMO_CHARS
+        cache.put(text, None, self._vec(0), {"answer": "a"})
+
+        (key,) = cache._lru
+        assert len(key[0]) <= QUERY_MEMO_CHARS
+        assert cache.get(text.upper(), None, self._vec(1)) == {"answer": "a"}
+
+    def test_paraphrase_hits_above_threshold(self):
+        """Test that a near-identical embedding returns the cached value."""
+        from rag.cache import SemanticCache
+        cache = SemanticCache(dim=8, threshold=0.9)
+        cache.put("intro cs courses", None, self._vec(0), {"answer": "a"})
+
+        assert cache.get("introductory computer science classes", None, self._vec(0)) == {"answer": "a"}
+        assert cache.get("medieval history seminars", None, self._vec(1)) is None
+
+    def test_department_must_match(self):
+        """Test that a hit under one department filter does not leak into another."""
+        from rag.cache import SemanticCache
+        cache = SemanticCache(dim=8)
+        cache.put("intro courses", "Computer Science", self._vec(0), {"answer": "a"})
+
+        assert cache.get("intro classes", "Mathematics", self._vec(0)) is None
+
+    def test_course_code_must_match(self):
+        """Test that paraphrases about different course codes never share answers."""
+        from rag.cache import SemanticCache
+        cache = SemanticCache(dim=8)
+        cache.put("Who teaches CSCI0320?", None, self._vec(0), {"answer": "a"})
+
+        assert cache.get("Who teaches CSCI0330?", None, self._vec(0)) is None
+
+    def test_eviction_bounds_size(self):
+        """Test that the semantic tier never grows past max_entries."""
+        from rag.cache import SemanticCache
+        cache = SemanticCache(dim=8, max_entries=8)
+        for i in range(20):
+            cache.put(f"query {i}", None, self._vec(i), {"answer": str(i)})
+
+        assert len(cache) <= 8
+        assert cache.index.ntotal == len(cache)
+
+    def test_save_load_round_trip(self, tmp_path):
+        """Test that the semantic tier survives a restart on the same corpus."""
+        from rag.cache import SemanticCache
+        cache = SemanticCache(dim=8, corpus="v1")
+        cache.put("intro cs courses", None, self._vec(0), {"answer": "a"})
+        cache.save(tmp_path)
+
+        restored = SemanticCache.load(dim=8, corpus="v1", path=tmp_path)
+        assert restored.get("introductory computer science", None, self._vec(0)) == {"answer": "a"}
+        assert not list(tmp_path.glob("*.tmp"))
+
+    def test_reindex_discards_saved_answers(self, tmp_path):
+        """Test that answers saved against another corpus are not restored."""
+        from rag.cache import SemanticCache
+        cache = SemanticCache(dim=8, corpus="v1")
+        cache.put("intro cs courses", None, self._vec(0), {"answer": "a"})
+        cache.save(tmp_path)
+
+        assert len(SemanticCache.load(dim=8, corpus="v2", path=tmp_path)) == 0
+
+    def test_torn_files_start_empty(self, tmp_path):
+        """Test that a truncated or mismatched save never crashes load()."""
+        from rag.cache import INDEX_NAME, ENTRY_NAME, SemanticCache
+        cache = SemanticCache(dim=8, corpus="v1")
+        cache.put("intro cs courses", None, self._vec(0), {"answer": "a"})
+        cache.save(tmp_path)
+        entries = (tmp_path / ENTRY_NAME).read_bytes()
+
+        (tmp_path / ENTRY_NAME).write_bytes(entries[: len(entries) // 2])
+        assert len(SemanticCache.load(dim=8, corpus="v1", path=tmp_path)) == 0
+
+        # Entries from one save paired with another save's index
+        (tmp_path / ENTRY_NAME).write_bytes(entries)
+        cache.put("roman history", None, self._vec(1), {"answer": "b"})
+        cache.save(tmp_path)
+        (tmp_path / ENTRY_NAME).write_bytes(entries)
+        assert len(SemanticCache.load(dim=8, corpus="v1", path=tmp_path)) == 0
+
+        (tmp_path / INDEX_NAME).write_bytes(b"\0" * 16)
+        assert len(SemanticCache.load(dim=8, corpus="v1", path=tmp_path)) == 0
+
+
+class TestBM25Index:
+    """Test the sparse BM25 scorer."""
+
+    CORPUS = [
+        "intro to machine learning".split(),
+        "linear algebra and matrix methods".split(),
+        "machine shop for engineers".split(),
+        "history of the roman empire".split(),
+    ]
+
+    @staticmethod
+    def _okapi(corpus, query, k1=1.5, b=0.75, epsilon=0.25):
+        """Reference BM25Okapi (rank_bm25's formula), one document at a time."""
+        import math
+        n, avgdl = len(corpus), sum(map(len, corpus)) / len(corpus)
+        df = {t: sum(t in doc for doc in corpus) for doc in corpus for t in doc}
+        idf = {t: math.log(n - f + 0.5) - math.log(f + 0.5) for t, f in df.items()}
+        floor = epsilon * sum(idf.values()) / len(idf)
+        idf = {t: v if v >= 0 else floor for t, v in idf.items()}
+        return [
+            sum(idf[q] * doc.count(q) * (k1 + 1)
+                / (doc.count(q) + k1 * (1 - b + b * len(doc) / avgdl))
+                for q in query if q in doc)
+            for doc in corpus
+        ]
+
+    def test_hand_computed_score(self):
+        """Test one score worked by hand: 'roman' in the 5-token history document."""
+        from rag.bm25 import BM25Index
+        # idf = ln(4 - 1 + 0.5) - ln(1 + 0.5) = ln(7/3); avgdl = 18/4 = 4.5
+        # tf part = 1 * 2.5 / (1 + 1.5 * (0.25 + 0.75 * 5 / 4.5)) = 2.5 / 2.625
+        expected = 0.8472979 * 2.5 / 2.625
+        scores = BM25Index(self.CORPUS).get_scores(["roman"])
+        assert scores[3] == pytest.approx(expected, rel=1e-5)
+        assert not scores[:3].any()
+
+    @pytest.mark.parametrize("compiled", [True, False], ids=["numba", "scipy"])
+    def test_matches_reference_okapi(self, compiled, monkeypatch):
+        """Test both column-sum paths against the reference formula, incl. the idf floor."""
+        import numpy as np
+        import rag.bm25
+        if compiled and rag.bm25._sum_columns is None:
+            pytest.skip("numba not installed")
+        if not compiled:
+            monkeypatch.setattr(rag.bm25, "_sum_columns", None)
+
+        # "a" is in 3 of 4 documents, so its raw idf is negative and floored
+        common = [["a", "b"], ["a", "c", "c"], ["a", "d"], ["e"]]
+        for corpus, queries in (
+            (self.CORPUS, (["machine", "learning"], ["the", "of"], ["matrix", "matrix"],
+                           ["machine", "roman", "quantum"])),
+            (common, (["a"], ["a", "c"], ["e", "e"])),
+        ):
+            bm25 = rag.bm25.BM25Index(corpus)
+            for query in queries:
+                np.testing.assert_allclose(bm25.get_scores(query), self._okapi(corpus, query),
+                                           rtol=1e-5, atol=1e-7)
+
+    def test_unknown_terms_score_zero(self):
+        """Test that out-of-vocabulary queries score every document 0."""
+        from rag.bm25 import BM25Index
+        scores = BM25Index(self.CORPUS).get_scores(["quantum"])
+        assert scores.shape == (4,)
+        assert not scores.any()
+
+    def test_matching_document_ranks_first(self):
+        """Test that the document containing both terms ranks first."""
+        from rag.bm25 import BM25Index
+        scores = BM25Index(self.CORPUS).get_scores(["machine", "learning"])
+        assert scores.argmax() == 0
+        assert scores[3] == 0
+
+    def test_scores_subset_of_documents(self):
+        """Test that scoring selected rows matches slicing the full score vector."""
+        import numpy as np
+        from rag.bm25 import BM25Index
+        bm25 = BM25Index(self.CORPUS)
+        docs = np.array([2, 0])
+        np.testing.assert_array_equal(bm25.get_scores(["machine"], docs),
+                                      bm25.get_scores(["machine"])[docs])
+        assert bm25.get_scores(["quantum"], docs).shape == (2,)
+
+    def test_disk_cache_round_trip_and_staleness(self, tmp_path):
+        """Test that the pickled index reloads, and is ignored once courses change."""
+        import numpy as np
+        from rag.search import load_bm25, save_bm25
+        courses = [{"course_code": "CSCI0320", "title": "Software Engineering"},
+                   {"course_code": "HIST0150", "title": "Roman Empire"}]
+        path = tmp_path / "bm25.pkl"
+        fitted = save_bm25(courses, path)
+
+        loaded = load_bm25(courses, path)
+        assert loaded is not None
+        np.testing.assert_array_equal(loaded.get_scores(["roman"]), fitted.get_scores(["roman"]))
+
+        courses[1]["title"] = "Byzantine Empire"
+        assert load_bm25(courses, path) is None
+
+    def test_corrupt_disk_cache_is_refit_and_rewritten(self, tmp_path):
+        """Test that a truncated bm25.pkl is ignored, then replaced on the next HybridSearch."""
+        import numpy as np
+        from rag.search import BM25_NAME, load_bm25, save_bm25
+        courses = [{"course_code": "CSCI0320", "title": "Software Engineering"},
+                   {"course_code": "HIST0150", "title": "Roman Empire"}]
+        path = tmp_path / BM25_NAME
+        save_bm25(courses, path)
+        path.write_bytes(path.read_bytes()[:20])
+        assert load_bm25(courses, path) is None
+
+        store = VectorStore.build(np.eye(2, 8, dtype=np.float32), courses)
+        store.path = tmp_path
+        HybridSearch(store)
+        assert load_bm25(store.courses, path) is not None
+        assert not list(tmp_path.glob("*.tmp"))
+
+
+class TestQueryBatcher:
+    """Test micro-batched query encoding."""
+
+    def test_concurrent_queries_share_one_batch(self):
+        """Test that queries arriving together are encoded in a single call."""
+        import asyncio
+        import numpy as np
+        from rag.batcher import QueryBatcher
+
+        calls = []
+
+        def fake_encode(texts):
+            calls.append(list(texts))
+            return np.array([[float(len(t))] for t in texts], dtype=np.float32)
+
+        async def run():
+            batcher = QueryBatcher(encode_fn=fake_encode, window=0.05)
+            out = await asyncio.gather(*(batcher.encode("x" * n) for n in (1, 2, 3)))
+            await batcher.close()
+            return out
+
+        out = asyncio.run(run())
+        assert calls == [["x", "xx", "xxx"]]
+        assert [o.shape for o in out] == [(1, 1)] * 3
+        assert [float(o[0, 0]) for o in out] == [1.0, 2.0, 3.0]
+
+    def test_repeated_query_skips_encoder(self):
+        """Test that a repeated query is served from the LRU without re-encoding."""
+        import asyncio
+        import numpy as np
+        from rag.batcher import QueryBatcher
+
+        calls = []
+
+        def fake_encode(texts):
+            calls.append(list(texts))
+            return np.ones((len(texts), 1), dtype=np.float32)
+
+        async def run():
+            batcher = QueryBatcher(encode_fn=fake_encode, cache_size=1)
+            for text in ("a", "a", "b", "a"):
+                await batcher.encode(text)
+            await batcher.close()
+
+        asyncio.run(run())
+        assert calls == [["a"], ["b"], ["a"]]   # "a" evicted by "b"
+
+    def test_long_query_is_not_cached(self):
+        """Test that queries over QUERY_MEMO_CHARS are re-encoded, not kept in the LRU."""
+        import asyncio
+        import numpy as np
+        from rag.batcher import QueryBatcher
+        from rag.search import QUERY_MEMO_CHARS
+
+        calls = []
+
+        def fake_encode(texts):
+            calls.append(list(texts))
+            return np.ones((len(texts), 1), dtype=np.float32)
+
+        long_text = "x" * (QUERY_MEMO_CHARS + 1)
+
+        async def run():
+            batcher = QueryBatcher(encode_fn=fake_encode)
+            await batcher.encode(long_text)
+            await batcher.encode(long_text)
+            await batcher.close()
+            return batcher
+
+        batcher = asyncio.run(run())
+        assert calls == [[long_text], [long_text]]
+        assert not batcher._lru
+
+    def test_encode_error_reaches_caller(self):
+        """Test that an encoder failure is raised to every waiting request."""
+        import asyncio
+        from rag.batcher import QueryBatcher
+
+        def broken(texts):
+            raise ValueError("boom")
+
+        async def run():
+            batcher = QueryBatcher(encode_fn=broken)
+            try:
+                await batcher.encode("q")
+            finally:
+                await batcher.close()
+
+        with pytest.raises(ValueError):
+            asyncio.run(run())